@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import logging
 import re
 from collections.abc import Callable, Iterator, Sequence
 from contextlib import contextmanager
@@ -61,6 +62,14 @@ class MessageBuffer(Sequence[Message]):
             self.folds.pending_states,
         )._repr_mimebundle_(include, exclude, **kwargs)
 
+    def _log_messages(self, messages: Sequence[Message]):
+        if not self.verbose and not logger.isEnabledFor(logging.DEBUG):
+            return
+        for message in messages:
+            logger.debug(message)
+            if self.verbose:
+                console.print(message)
+
     def add(self, message: Message | None):
         if message is not None:
             self.add_message(message)
@@ -73,8 +82,21 @@ class MessageBuffer(Sequence[Message]):
         self.folds.add(message)
 
     def add_messages(self, messages: Sequence[Message]):
-        for message in messages:
-            self.add_message(message)
+        self._log_messages(messages)
+        self.pending.extend(messages)
+        self.folds.add_messages(messages)
+
+    def replace_all(self, messages: Sequence[Message]):
+        """
+        Replaces all messages, including pending ones, with `messages` and commits
+        them in a single transaction.
+        """
+        self._log_messages(messages)
+        # refill the existing lists instead of allocating new ones
+        self.messages[:] = messages
+        self.pending.clear()
+        self._transactional_bounds[:] = [(0, len(self.messages) - 1)]
+        self.folds.clear(self.messages, self.pending)
 
     def clear(self):
         self.messages = []
@@ -126,6 +148,35 @@ class MessageBuffer(Sequence[Message]):
         with self.folds.expand(tags, self.messages, self.pending):
             yield self
 
+    def view(
+        self,
+        tags: (
+            Tag
+            | TagPattern
+            | set[Tag]
+            | set[TagPattern]
+            | frozenset[TagPattern]
+            | tuple[str | re.Pattern, str | re.Pattern]
+            | dict[str | re.Pattern, str | re.Pattern]
+            | set[tuple[str | re.Pattern, str | re.Pattern]]
+            | set[dict[str | re.Pattern, str | re.Pattern]]
+            | Callable[[set[Tag]], bool]
+        ),
+    ) -> list[Message]:
+        """
+        Returns the messages that are visible when expanding `tags`.
+        """
+        if not self.folds.has_custom_folds:
+            # without custom folds, expanding only unfolds the messages matching
+            # `tags` on top of the default folds, so the view can be derived
+            # directly instead of unfolding and restoring the fold states;
+            # message tags may have changed since they were added, so the fold
+            # states are still updated once
+            self.folds.update(self.messages, self.pending)
+            return self.folds.apply_expanded(tags, self.messages, self.pending)
+        with self.expand(tags) as messages:
+            return list(messages)
+
     def filter(
         self,
         predicate: Callable[[Message], bool] = lambda _: True,
@@ -172,7 +223,7 @@ class MessageBuffer(Sequence[Message]):
         self.folds.fold(tags, self.messages, self.pending)
 
     def rollback(self):
-        self.pending = []
+        self.pending.clear()
         self.folds.rollback()
 
     def revert(self):
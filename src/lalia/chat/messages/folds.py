@@ -147,9 +147,16 @@ class Folds:
                 state=FoldState.UNFOLDED,
             )
 
+    @property
+    def has_custom_folds(self) -> bool:
+        return bool(self._folds)
+
     def add(self, message: Message):
         self.pending_states.append(self.get_fold_state(message))
 
+    def add_messages(self, messages: Sequence[Message]):
+        self.pending_states.extend(self.get_fold_state(message) for message in messages)
+
     def apply(
         self, messages: Sequence[Message], pending: Sequence[Message]
     ) -> tuple[Iterator[Message], Iterator[Message]]:
@@ -163,6 +170,56 @@ class Folds:
             if fold is FoldState.UNFOLDED
         )
 
+    def apply_unfolded(
+        self, messages: Sequence[Message], pending: Sequence[Message]
+    ) -> list[Message]:
+        """
+        Applies the folds as if all tagged messages were unfolded.
+        """
+        return [
+            message
+            for message, fold in zip(
+                chain(messages, pending),
+                chain(self.message_states, self.pending_states),
+                strict=True,
+            )
+            if message.tags or fold is FoldState.UNFOLDED
+        ]
+
+    def apply_expanded(
+        self,
+        tags: (
+            Tag
+            | TagPattern
+            | set[Tag]
+            | set[TagPattern]
+            | tuple[str | re.Pattern, str | re.Pattern]
+            | dict[str | re.Pattern, str | re.Pattern]
+            | set[tuple[str | re.Pattern, str | re.Pattern]]
+            | set[dict[str | re.Pattern, str | re.Pattern]]
+            | Callable[[set[Tag]], bool]
+        ),
+        messages: Sequence[Message],
+        pending: Sequence[Message],
+    ) -> list[Message]:
+        """
+        Applies the folds as if the messages matching `tags` were unfolded.
+
+        Only equivalent to expanding if there are no custom folds.
+        """
+        if not tags:
+            return self.apply_unfolded(messages, pending)
+        predicate = derive_tag_predicate(tags)
+        return [
+            message
+            for message, fold in zip(
+                chain(messages, pending),
+                chain(self.message_states, self.pending_states),
+                strict=True,
+            )
+            if fold is FoldState.UNFOLDED or predicate(message.tags)
+        ]
+
     def clear(self, messages: Sequence[Message], pending: Sequence[Message]):
         self._folds.clear()
         self.update(messages, pending)
@@ -184,9 +241,12 @@ class Folds:
         messages: Sequence[Message],
         pending: Sequence[Message],
     ):
+        folds = [*self._folds]
         self.fold(tags, messages, pending)
-        yield self
-        self.unfold(tags, messages, pending)
+        try:
+            yield self
+        finally:
+            self._restore(folds, messages, pending)
 
     def commit(self):
         self.message_states.extend(self.pending_states)
@@ -209,9 +269,12 @@ class Folds:
         messages: Sequence[Message],
         pending: Sequence[Message],
     ):
+        folds = [*self._folds]
         self.unfold(tags, messages, pending)
-        yield self
-        self.fold(tags, messages, pending)
+        try:
+            yield self
+        finally:
+            self._restore(folds, messages, pending)
 
     def get_fold_state(self, message: Message) -> FoldState:
         folds = chain(reversed(self._folds), [self._default_folds])
@@ -250,6 +313,17 @@ class Folds:
 
         self.update(messages, pending)
 
+    def _restore(
+        self,
+        folds: list[Fold],
+        messages: Sequence[Message],
+        pending: Sequence[Message],
+    ):
+        # restoring the previous folds instead of applying the inverse fold keeps
+        # the folds from growing with every expansion
+        self._folds[:] = folds
+        self.update(messages, pending)
+
     def revert(self, start: int, end: int):
         self.pending_states = self.message_states[start : end + 1] + self.pending_states
         self.message_states = self.message_states[:start]
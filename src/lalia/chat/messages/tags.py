@@ -22,6 +22,8 @@ class DefaultTagKeys(StrEnum):
 
 GROUP_COLORS_BY_KEY = True
 
+MATCH_ANY_PATTERN = ".*"
+
 
 def _is_tag_pattern_tuple(
     tags: object,
@@ -46,6 +48,7 @@ def _convert_tag_like_set(
         | set[dict[str | re.Pattern, str | re.Pattern]]
         | set[Tag]
         | set[TagPattern]
+        | frozenset[TagPattern]
     ),
 ) -> set[TagPattern]:
     return {TagPattern.from_tag_like(tag) for tag in tags}
@@ -57,6 +60,7 @@ def convert_tag_like(
         | TagPattern
         | set[Tag]
         | set[TagPattern]
+        | frozenset[TagPattern]
         | tuple[str | re.Pattern, str | re.Pattern]
         | dict[str | re.Pattern, str | re.Pattern]
         | set[tuple[str | re.Pattern, str | re.Pattern]]
@@ -67,7 +71,7 @@ def convert_tag_like(
     match tags:
         case Tag() | TagPattern():
             return {TagPattern.from_tag_like(tags)}
-        case set() as tags_:
+        case set() | frozenset() as tags_:
             return _convert_tag_like_set(tags_)
         case tuple() as tag:
             return {TagPattern.from_tag_like(tag)}
@@ -116,12 +120,28 @@ class PredicateRegistry:
             case TagPattern(
                 key=re.Pattern() as key_pattern, value=re.Pattern() as value_pattern
             ) as tag_pattern:
+                matches_any_key = key_pattern.pattern == MATCH_ANY_PATTERN
+                matches_any_value = value_pattern.pattern == MATCH_ANY_PATTERN
+
+                # `.*` matches any string, so it does not need to be evaluated
+                if matches_any_key and matches_any_value:
+
+                    def matches_any_tag(tags: set[Tag]) -> bool:
+                        return bool(tags)
+
+                elif matches_any_value:
+
+                    def matches_any_tag(tags: set[Tag]) -> bool:
+                        return any(key_pattern.match(tag.key) for tag in tags)
+
+                else:
 
-                def matches_any_tag(tags: set[Tag]) -> bool:
-                    return any(
-                        key_pattern.match(tag.key) and value_pattern.match(tag.value)
-                        for tag in tags
-                    )
+                    def matches_any_tag(tags: set[Tag]) -> bool:
+                        return any(
+                            key_pattern.match(tag.key)
+                            and value_pattern.match(tag.value)
+                            for tag in tags
+                        )
 
                 if tag_pattern not in cls._predicates:
                     cls.register_predicate(tag_pattern, matches_any_tag)
@@ -1,24 +1,33 @@
 from __future__ import annotations
 
+import asyncio
 import functools
-import json
-from collections.abc import Callable, Sequence
-from dataclasses import field
-from typing import Any, Unpack
+import hashlib
+import sys
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import field, fields
+from typing import Any, Unpack, get_type_hints
 from uuid import uuid4
 
 from pydantic import (
     UUID4,
     ConfigDict,
     Field,
+    TypeAdapter,
     field_serializer,
     field_validator,
     validate_call,
 )
 from pydantic.dataclasses import dataclass
 
+if sys.version_info < (3, 12):
+    from typing_extensions import TypedDict
+else:
+    from typing import TypedDict
+
 from lalia.chat import dispatchers
-from lalia.chat.completions import Completion
+from lalia.chat.completions import Choice, Completion
 from lalia.chat.finish_reason import FinishReason
 from lalia.chat.messages import (
     AssistantMessage,
@@ -49,9 +58,19 @@ from lalia.io.serialization.functions import (
     serialize_callable,
     serialize_callables,
 )
+from lalia.io.serialization.json import to_json
 from lalia.io.storage import DictStorageBackend, StorageBackend
-from lalia.llm.llm import LLM, CallKwargs, CompleteKwargs, P, R_co, Wrapped
-from lalia.llm.openai import Choice, Usage
+from lalia.llm.llm import (
+    LLM,
+    CallKwargs,
+    ChatCompletionResponse,
+    CompleteKwargs,
+    P,
+    R_co,
+    Usage,
+    Wrapped,
+)
+from lalia.utils.adapters import get_adapter
 
 logger = get_logger(__name__)
 
@@ -66,9 +85,65 @@ ARGUMENT_PARSING_FAILURE_MESSAGE_TEMPLATE = (
 
 FAILURE_QUERY = "What went wrong? Do I need to provide more information?"
 
+ERROR_CONTEXT = frozenset({TagPattern("error", ".*")})
+
+MAX_FUNCTION_CALL_WORKERS = 8
+
+MAX_SESSION_WORKERS = 8
+
+TAG_CACHE_SIZE = 256
+
+
+@functools.lru_cache(maxsize=TAG_CACHE_SIZE)
+def _get_tag(key: str, value: str) -> Tag:
+    # tags are frozen, so messages can share them
+    return Tag(key, value)
+
+
+def _get_prompt_cache_key(
+    messages: Sequence[Message], functions: Sequence[Callable[..., Any]]
+) -> str:
+    """
+    Derives a fingerprint of the static prefix of a session's requests.
+    """
+    adapter = get_adapter(list[Message])
+    prefix = {
+        "messages": [
+            {
+                key: value
+                for key, value in raw_message.items()
+                if key not in {"tags", "timestamp"}
+            }
+            for raw_message in adapter.dump_python(
+                list(messages), mode="json", exclude_none=True
+            )
+        ],
+        "functions": [get_name(func) for func in functions],
+    }
+    return hashlib.blake2b(to_json(prefix).encode(), digest_size=16).hexdigest()
+
+
+@functools.cache
+def _get_arguments_adapter(cls: type) -> TypeAdapter[dict[str, Any]]:
+    """
+    Derives an adapter that validates the fields of a dataclass without
+    instantiating it.
+    """
+    type_hints = get_type_hints(cls, include_extras=True)
+    arguments = TypedDict(  # type: ignore
+        f"{cls.__name__}Arguments",
+        {field_.name: type_hints[field_.name] for field_ in fields(cls)},
+        total=False,
+    )
+    arguments.__pydantic_config__ = ConfigDict(  # type: ignore
+        arbitrary_types_allowed=True, extra="forbid"
+    )
+    return TypeAdapter(arguments)
+
 
 @dataclass(
     kw_only=True,
+    slots=True,
     config=ConfigDict(arbitrary_types_allowed=True),
 )
 class Session:
@@ -99,6 +174,8 @@ class Session:
     max_iterations: int = 10
     max_function_call_attempts: int = 5
     rollback_on_error: bool = True
+    # only passed to the llm if set, see `derive_prompt_cache_key`
+    prompt_cache_key: str | None = None
     verbose: bool = False
 
     @field_validator("system_message", mode="before")
@@ -138,24 +215,41 @@ class Session:
         instance.load(session_id=session_id, **kwargs)
         return instance
 
+    @staticmethod
+    def complete_flows(
+        sessions: Sequence[Session],
+        messages: Sequence[Message | None],
+        max_workers: int = MAX_SESSION_WORKERS,
+    ) -> list[Completion]:
+        """
+        Completes the flows of independent sessions concurrently.
+
+        Each session handles its message like `complete_flow`, the completions are
+        returned in order of the sessions. Sessions must not be passed more than
+        once, as a session's flow is not thread-safe; sessions may share an llm.
+        """
+        if len(sessions) != len(messages):
+            raise ValueError("Expected one message per session")
+        if len({id(session) for session in sessions}) != len(sessions):
+            raise ValueError("Expected distinct sessions")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(Session.complete_flow, sessions, messages))
+
     def __post_init__(self):
         if isinstance(self.system_message, str):
             self.system_message = SystemMessage(content=self.system_message)
 
-        for func in self.functions:
-            CallableRegistry.register_callable(func)
+        self._register_functions()
 
         if not self.messages:
             self.messages = MessageBuffer(
                 verbose=self.verbose,
                 default_fold_tags=self.default_fold_tags,
             )
-
-        if self.system_message is not None:
-            self.messages.add(self.system_message)
-
-        if self.init_messages:
-            self.messages.add_messages(self.init_messages)
+            self.messages.replace_all(self._get_initial_messages())
+        else:
+            self.messages.add_messages(self._get_initial_messages())
 
     @validate_call
     def __call__(
@@ -168,13 +262,36 @@ class Session:
         completion = self.complete_flow(message)
         return completion.message
 
+    def _complete(
+        self,
+        message: Message | None = None,
+        context: set[TagPattern] | None = None,
+        **llm_kwargs: Unpack[CompleteKwargs],
+    ) -> Completion:
+        call, response = self._complete_response(message, context, **llm_kwargs)
+        return self._handle_completion(call, response.choices[0])
+
     def _complete_choices(
         self,
         message: Message | None = None,
         context: set[TagPattern] | None = None,
         **llm_kwargs: Unpack[CompleteKwargs],
     ) -> list[Completion]:
-        self.messages.add(message)
+        call, response = self._complete_response(message, context, **llm_kwargs)
+        results = self._execute_function_calls(response.choices)
+        return [
+            self._handle_completion(call, choice, result)
+            for choice, result in zip(response.choices, results, strict=True)
+        ]
+
+    def _complete_response(
+        self,
+        message: Message | None = None,
+        context: set[TagPattern] | None = None,
+        **llm_kwargs: Unpack[CompleteKwargs],
+    ) -> tuple[dispatchers.DispatchCall, ChatCompletionResponse]:
+        if message is not None:
+            self.messages.add_message(message)
 
         call = self.dispatcher.dispatch(self)
 
@@ -183,48 +300,85 @@ class Session:
         if "functions" not in kwargs:
             kwargs["functions"] = self.functions
 
+        if "prompt_cache_key" not in kwargs and self.prompt_cache_key is not None:
+            kwargs["prompt_cache_key"] = self.prompt_cache_key
+
         if context:
             context = context | call.context
         else:
             context = call.context
 
-        with call.messages.expand(context) as messages:
-            progress = GeneratingProgress(
-                function=kwargs.get("function_call", {}).get("name")
-            )
-            self.progress_manager.emit(progress)
-            response = call.callback(
-                messages=messages,
-                context=context,
-                **kwargs,
-            )
+        messages = call.messages.view(context)
+        progress = GeneratingProgress(
+            function=kwargs.get("function_call", {}).get("name")
+        )
+        self.progress_manager.emit(progress)
+        response = call.callback(
+            messages=self._limit_messages(messages),
+            context=context,
+            **kwargs,
+        )
 
         logger.debug(response)
 
-        completions = []
+        return call, response
 
-        for choice in response.choices:
-            completion_message, finish_reason = self._handle_choice(choice)
+    def _execute_function_calls(
+        self, choices: Sequence[Choice]
+    ) -> list[FunctionCallResult | None]:
+        """
+        Executes the function calls of multiple choices concurrently.
 
-            if call.finish_reason is not FinishReason.DELEGATE:
-                finish_reason = call.finish_reason
+        The results are handled in order of the choices afterwards. Function calls
+        that need to be retried are still executed sequentially.
 
-            completions.append(Completion(completion_message, finish_reason))
+        All function calls are executed before any choice is handled. If a call
+        raises, the exception is propagated once the other calls have finished,
+        so their side effects have already happened, unlike when the choices are
+        handled one after another.
+        """
+        function_calls: dict[int, tuple[str, Function[..., Any], dict[str, Any]]] = {}
+        for i, choice in enumerate(choices):
+            match choice.message:
+                case AssistantMessage(
+                    function_call=FunctionCall(
+                        name=name, function=function, arguments=arguments
+                    )
+                ) if function is not None and arguments is not None:
+                    function_calls[i] = (name, function, arguments)
+
+        results: list[FunctionCallResult | None] = [None] * len(choices)
+        if len(function_calls) <= 1:
+            return results
+
+        def execute(
+            name: str, function: Function[..., Any], arguments: dict[str, Any]
+        ) -> FunctionCallResult:
+            # the progress is emitted when the call starts, not when it is handled
+            progress = ExecutingProgress(function=name, arguments=arguments)
+            self.progress_manager.emit(progress)
+            return execute_function_call(function, arguments)
 
-            if finish_reason is FinishReason.STOP:
-                if self.autocommit:
-                    self.messages.commit()
-                self.dispatcher.reset()
+        max_workers = min(len(function_calls), MAX_FUNCTION_CALL_WORKERS)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                i: executor.submit(execute, *function_call)
+                for i, function_call in function_calls.items()
+            }
+            for i, future in futures.items():
+                results[i] = future.result()
 
-        return completions
+        return results
 
     def _complete_failure(self, message: Message | None = None) -> Completion:
         # TODO: Accept `Error` isstead of `Message`?
-        self.messages.add(message)
-        self.messages.add_messages(self.failure_messages)
+        if message is None:
+            self.messages.add_messages(self.failure_messages)
+        else:
+            self.messages.add_messages([message, *self.failure_messages])
 
-        with self.messages.expand({TagPattern("error", ".*")}) as messages:
-            choice, *_ = self.llm.complete(messages).choices
+        messages = self.messages.view(ERROR_CONTEXT)
+        choice, *_ = self.llm.complete(self._limit_messages(messages)).choices
 
         assistant_message, finish_reason = self._handle_choice(choice)
 
@@ -238,24 +392,25 @@ class Session:
         error_message: FunctionMessage,
         context: set[TagPattern],
         function: Callable[..., Any],
+        name: str,
     ) -> AssistantMessage:
         """
         Completes an erroneous function call and adds a tagged error message to the
         session's messages.
         """
 
-        self.messages.add(error_message)
+        self.messages.add_message(error_message)
 
         error_context = {TagPattern.from_tag_like(tag) for tag in error_message.tags}
-        with self.messages.expand(context | error_context) as messages:
-            logger.debug(list(messages))
-            response = self.llm.complete(
-                messages=messages,
-                context=context,
-                functions=[function],
-                function_call={"name": get_name(function)},
-                n_choices=1,
-            )
+        messages = self.messages.view(context | error_context)
+        logger.debug(messages)
+        response = self.llm.complete(
+            messages=self._limit_messages(messages),
+            context=context,
+            functions=[function],
+            function_call={"name": name},
+            n_choices=1,
+        )
 
         choice, *_ = response.choices
         function_call_message = choice.message
@@ -263,7 +418,9 @@ class Session:
         return function_call_message
 
     def _handle_function_call_message(
-        self, function_call_message: AssistantMessage
+        self,
+        function_call_message: AssistantMessage,
+        result: FunctionCallResult | None = None,
     ) -> tuple[FunctionMessage, FinishReason]:
         for i in range(1, self.max_function_call_attempts + 1):
             match function_call_message.function_call:
@@ -275,23 +432,28 @@ class Session:
                     arguments=arguments,
                     parsing_error_messages=parsing_error_messages,
                 ):
-                    progress = ExecutingProgress(
-                        iteration=i,
-                        function=name,
-                        arguments=arguments,
-                    )
-                    self.progress_manager.emit(progress)
+                    if result is None:
+                        # calls executed in advance have emitted their progress
+                        progress = ExecutingProgress(
+                            iteration=i,
+                            function=name,
+                            arguments=arguments,
+                        )
+                        self.progress_manager.emit(progress)
 
-                    function_call_message.tags.add(Tag("function", name))
+                    function_call_message.tags.add(_get_tag("function", name))
 
                     if parsing_error_messages:
                         logger.debug(parsing_error_messages)
-                        self.messages.add_messages(parsing_error_messages)
 
-                    self.messages.add(function_call_message)
+                    self.messages.add_messages(
+                        [*parsing_error_messages, function_call_message]
+                    )
 
                     if arguments is None or function is None:
-                        function_call_message.tags.add(Tag("error", "function_call"))
+                        function_call_message.tags.add(
+                            _get_tag("error", "function_call")
+                        )
                         return self._handle_function_call_failure(
                             failure_content=(
                                 ARGUMENT_PARSING_FAILURE_MESSAGE_TEMPLATE.format(
@@ -302,18 +464,23 @@ class Session:
                         )
 
                     function_message, finish_reason = self._handle_function_call(
-                        name, function, arguments
+                        name, function, arguments, result
                     )
+                    # only the first attempt may have been executed in advance
+                    result = None
 
                     if finish_reason is FinishReason.FUNCTION_CALL_FAILURE:
                         return function_message, finish_reason
 
                     if finish_reason is FinishReason.FUNCTION_CALL_ERROR:
-                        function_call_message.tags.add(Tag("error", "function_call"))
+                        function_call_message.tags.add(
+                            _get_tag("error", "function_call")
+                        )
                         function_call_message = self._complete_function_call_error(
                             error_message=function_message,
                             context=function_call_message.function_call.context,
                             function=function,
+                            name=name,
                         )
                         continue
 
@@ -333,7 +500,7 @@ class Session:
         )
 
     def _handle_choice(
-        self, choice: Choice
+        self, choice: Choice, result: FunctionCallResult | None = None
     ) -> tuple[AssistantMessage | FunctionMessage, FinishReason]:
         logger.debug(choice)
         match choice.message:
@@ -343,19 +510,66 @@ class Session:
                 )
             case AssistantMessage(_, FunctionCall()) as function_call_message:
                 function_message, finish_reason = self._handle_function_call_message(
-                    function_call_message
+                    function_call_message, result
                 )
                 if finish_reason is FinishReason.DELEGATE:
                     finish_reason = choice.finish_reason
 
-                self.messages.add(function_message)
+                self.messages.add_message(function_message)
                 return function_message, finish_reason
             case AssistantMessage(_, None) as assistant_message:
-                self.messages.add(assistant_message)
+                self.messages.add_message(assistant_message)
                 return assistant_message, choice.finish_reason
             case _:
                 raise ValueError(f"Unsupported message type: {type(choice.message)}")
 
+    def _limit_messages(self, messages: Iterable[Message]) -> list[Message]:
+        """
+        Limits the messages sent to the llm to a leading system message and the
+        last `memory` messages.
+        """
+        messages = list(messages)
+        start = 1 if messages and isinstance(messages[0], SystemMessage) else 0
+        if len(messages) - start <= self.memory:
+            return messages
+
+        recent = len(messages) - self.memory
+        # function messages must not be separated from their function calls
+        while recent < len(messages) and isinstance(messages[recent], FunctionMessage):
+            recent += 1
+
+        return [*messages[:start], *messages[recent:]]
+
+    def _register_functions(self):
+        # the functions are passed to every completion, a tuple lets the llm cache
+        # their schemas
+        self.functions = tuple(self.functions)
+        for func in self.functions:
+            CallableRegistry.register_callable(func)
+
+    def _get_initial_messages(self) -> list[Message]:
+        if self.system_message is None:
+            return [*self.init_messages]
+        return [self.system_message, *self.init_messages]
+
+    def _handle_completion(
+        self,
+        call: dispatchers.DispatchCall,
+        choice: Choice,
+        result: FunctionCallResult | None = None,
+    ) -> Completion:
+        completion_message, finish_reason = self._handle_choice(choice, result)
+
+        if call.finish_reason is not FinishReason.DELEGATE:
+            finish_reason = call.finish_reason
+
+        if finish_reason is FinishReason.STOP:
+            if self.autocommit:
+                self.messages.commit()
+            self.dispatcher.reset()
+
+        return Completion(completion_message, finish_reason)
+
     def _handle_exception(self, exception: BaseException):
         try:
             if self.rollback_on_error:
@@ -366,15 +580,21 @@ class Session:
             raise exception
 
     def _handle_function_call(
-        self, name: str, function: Callable[..., Any], arguments: dict[str, Any]
+        self,
+        name: str,
+        function: Callable[..., Any],
+        arguments: dict[str, Any],
+        result: FunctionCallResult | None = None,
     ) -> tuple[FunctionMessage, FinishReason]:
         """
         Executes a function call and returns the result as a FunctionMessage.
 
-        Executions run in a retry loop to handle errors.
+        Executions run in a retry loop to handle errors. A `result` of a call that
+        was already executed is used as is.
         """
 
-        result = execute_function_call(function, arguments)
+        if result is None:
+            result = execute_function_call(function, arguments)
         logger.debug(result)
 
         match result:
@@ -384,14 +604,14 @@ class Session:
                 if isinstance(value, str):
                     value_content = value
                 else:
-                    value_content = json.dumps(value, indent=2, default=str)
+                    value_content = to_json(value)
                 return (
                     FunctionMessage(
                         name=name,
                         content=value_content,
                         result=result,
                         tags={
-                            Tag("function", name),
+                            _get_tag("function", name),
                         },
                     ),
                     finish_reason,
@@ -407,8 +627,8 @@ class Session:
                         content=f"Error: {error.message}",
                         result=None,
                         tags={
-                            Tag("function", name),
-                            Tag("error", "function_call"),
+                            _get_tag("function", name),
+                            _get_tag("error", "function_call"),
                         },
                     ),
                     finish_reason,
@@ -426,8 +646,8 @@ class Session:
                 content=failure_content,
                 result=None,
                 tags={
-                    Tag("function", name),
-                    Tag("error", "function_call"),
+                    _get_tag("function", name),
+                    _get_tag("error", "function_call"),
                 },
             ),
             FinishReason.FAILURE,
@@ -438,6 +658,53 @@ class Session:
     ) -> dict[str, str]:
         return self.messages._repr_mimebundle_(include, exclude, **kwargs)
 
+    async def acomplete(
+        self,
+        message: Message | None = None,
+        context: set[TagPattern] | None = None,
+        **complete_kwargs: Unpack[CompleteKwargs],
+    ) -> Completion:
+        """
+        Runs `complete` in a worker thread, so that multiple sessions can await
+        their completions concurrently.
+        """
+        return await asyncio.to_thread(
+            self.complete, message, context, **complete_kwargs
+        )
+
+    async def acomplete_choices(
+        self,
+        message: Message | None = None,
+        context: set[TagPattern] | None = None,
+        **complete_kwargs: Unpack[CompleteKwargs],
+    ) -> list[Completion]:
+        """
+        Runs `complete_choices` in a worker thread, so that multiple sessions can
+        await their completions concurrently.
+        """
+        return await asyncio.to_thread(
+            self.complete_choices, message, context, **complete_kwargs
+        )
+
+    async def acomplete_flow(
+        self,
+        message: Message | None = None,
+        context: set[TagPattern] | None = None,
+    ) -> Completion:
+        """
+        Runs `complete_flow` in a worker thread, so that multiple sessions can
+        await their completions concurrently.
+        """
+        return await asyncio.to_thread(self.complete_flow, message, context)
+
+    async def acall(
+        self, user_input: str | UserMessage | None = None
+    ) -> AssistantMessage | FunctionMessage:
+        """
+        Runs the session on `user_input` in a worker thread, like calling it.
+        """
+        return await asyncio.to_thread(self, user_input)
+
     def add(self, message: Message):
         self.messages.add(message)
 
@@ -447,22 +714,20 @@ class Session:
         prompt: Callable[..., Sequence[Message]],
         **call_kwargs: Unpack[CallKwargs],
     ):
-        def merge_prompt(
-            *prompt_args: P.args, **prompt_kwargs: P.kwargs
-        ) -> Sequence[Message]:
-            return [*self.messages.messages, *prompt(*prompt_args, **prompt_kwargs)]
-
         def decorator(func: Wrapped[P, R_co]) -> Wrapped[P, R_co]:
             @functools.wraps(func)
             def wrapper(*prompt_args: P.args, **prompt_kwargs: P.kwargs) -> R_co:
+                # build the prompt once and reuse it for the request and the buffer
+                prompt_messages = [*prompt(*prompt_args, **prompt_kwargs)]
+
+                def merge_prompt(*_args: Any, **_kwargs: Any) -> Sequence[Message]:
+                    return [*self.messages.messages, *prompt_messages]
+
                 function_call = self.llm.call(prompt=merge_prompt, **call_kwargs)(func)
 
                 response = function_call(*prompt_args, **prompt_kwargs)
                 self.messages.add_messages(
-                    [
-                        *prompt(*prompt_args, **prompt_kwargs),
-                        AssistantMessage(content=str(response)),
-                    ]
+                    [*prompt_messages, AssistantMessage(content=str(response))]
                 )
 
                 if self.autocommit:
@@ -482,7 +747,10 @@ class Session:
         context: set[TagPattern] | None = None,
         **complete_kwargs: Unpack[CompleteKwargs],
     ) -> Completion:
-        return next(iter(self.complete_choices(message, context, **complete_kwargs)))
+        try:
+            return self._complete(message, context, **complete_kwargs)
+        except Exception as e:
+            self._handle_exception(e)
 
     @validate_call
     def complete_choices(
@@ -502,13 +770,13 @@ class Session:
         message: Message | None = None,
         context: set[TagPattern] | None = None,
     ) -> Completion:
-        self.messages.add(message)
+        if message is not None:
+            self.messages.add_message(message)
         try:
             for _ in range(self.max_iterations):
-                completion = self.complete(context=context)
-                match completion.finish_reason:
-                    case FinishReason.STOP:
-                        return completion
+                completion = self._complete(context=context)
+                if completion.finish_reason is FinishReason.STOP:
+                    return completion
             return self._complete_failure()
         except (Exception, KeyboardInterrupt) as e:
             self._handle_exception(e)
@@ -516,22 +784,37 @@ class Session:
     def commit(self):
         self.messages.commit()
 
+    def derive_prompt_cache_key(self) -> str:
+        """
+        Derives a fingerprint of the system message, init messages and functions.
+
+        Setting it as `prompt_cache_key` routes requests sharing this prefix to the
+        same prompt cache, if the llm supports it.
+        """
+        return _get_prompt_cache_key(self._get_initial_messages(), self.functions)
+
     def load(self, session_id: UUID4, **kwargs):
-        arguments = self.storage_backend.load(session_id)
+        arguments = {**self.storage_backend.load(session_id), **kwargs}
         # currently, llms are not serialized
         if "llm" not in kwargs:
-            arguments["llm"] = self.llm
-        if "storage_backend" not in kwargs:
-            arguments["storage_backend"] = self.storage_backend
-        arguments.update(kwargs)
-        validated_arguments = vars(type(self)(**arguments))
-        vars(self).update(validated_arguments)
+            arguments.pop("llm", None)
+
+        # validate the fields in place instead of constructing another session,
+        # which would also add the initial messages to the loaded ones again
+        if "system_message" in arguments:
+            arguments["system_message"] = self.validate_system_message(
+                arguments["system_message"]
+            )
+        validated_arguments = _get_arguments_adapter(type(self)).validate_python(
+            arguments
+        )
+        for name, value in validated_arguments.items():
+            setattr(self, name, value)
+
+        self._register_functions()
 
     def reset(self):
-        self.messages.clear()
-        self.messages.add(self.system_message)
-        self.messages.add_messages(self.init_messages)
-        self.messages.commit()
+        self.messages.replace_all(self._get_initial_messages())
 
         self.dispatcher.reset()
 
@@ -548,10 +831,15 @@ class Session:
 
     @property
     def tokens_used(self) -> Usage:
-        usages = (response["usage"].values() for response in self.llm._responses)
-        prompt_tokens, completion_tokens, choice_tokens = zip(*usages, strict=True)
+        if isinstance(usage := getattr(self.llm, "usage", None), Usage):
+            return usage
+        usages = [response["usage"] for response in self.llm._responses]
         return Usage(
-            prompt=sum(prompt_tokens),
-            completion=sum(completion_tokens),
-            total=sum(choice_tokens),
+            prompt=sum(usage["prompt_tokens"] for usage in usages),
+            completion=sum(usage["completion_tokens"] for usage in usages),
+            total=sum(usage["total_tokens"] for usage in usages),
+            cached=sum(
+                (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+                for usage in usages
+            ),
         )
@@ -29,6 +29,8 @@ from lalia.io.serialization.functions import (
 # need to import Prop so FunctionSchema is correctly defined for pydantic
 # TODO: fix circular import
 from lalia.io.serialization.json_schema import ObjectProp, Prop  # noqa: F401
+from lalia.utils.adapters import get_adapter
+from lalia.utils.decorators import cache_hashable
 
 logger = get_logger(__name__)
 
@@ -36,6 +38,10 @@ logger = get_logger(__name__)
 T = TypeVar("T")
 P = ParamSpec("P")
 
+VALIDATED_CALLABLE_CACHE_SIZE = 128
+
+DEFS_REF_PREFIX = "#/$defs/"
+
 Function = Annotated[
     Callable[P, T], BeforeValidator(parse_callable), PlainSerializer(serialize_callable)
 ]
@@ -93,7 +99,7 @@ class FunctionSchema:
     description: str | None = None
 
     def to_dict(self) -> dict:
-        return TypeAdapter(type(self)).dump_python(
+        return get_adapter(type(self)).dump_python(
             self, exclude_none=True, by_alias=True
         )
 
@@ -109,12 +115,54 @@ class FunctionSchema:
         return self
 
 
+def _has_refs(value: Any) -> bool:
+    match value:
+        case dict():
+            return "$ref" in value or any(_has_refs(item) for item in value.values())
+        case list():
+            return any(_has_refs(item) for item in value)
+    return False
+
+
+def _inline_refs(
+    value: Any, defs: dict[str, Any], resolving: frozenset[str] = frozenset()
+) -> Any:
+    match value:
+        case {"$ref": str() as ref}:
+            name = ref.removeprefix(DEFS_REF_PREFIX)
+            if name == ref or "/" in name or "~" in name:
+                raise ValueError(f"Unsupported reference: '{ref}'")
+            if name in resolving:
+                raise ValueError(f"Circular reference: '{ref}'")
+            # like jsonref, the referenced schema replaces the whole object
+            return _inline_refs(defs[name], defs, resolving | {name})
+        case dict():
+            return {
+                key: _inline_refs(item, defs, resolving) for key, item in value.items()
+            }
+        case list():
+            return [_inline_refs(item, defs, resolving) for item in value]
+    return value
+
+
 def dereference_schema(schema: dict[str, Any]) -> dict[str, Any]:
-    return {
-        key: value
-        for key, value in replace_refs(schema, proxies=False).items()  # type: ignore
-        if key != "$defs"
-    }
+    # resolving references is expensive, most function schemas don't have any
+    if not _has_refs(schema):
+        return {key: value for key, value in schema.items() if key != "$defs"}
+
+    defs = schema.get("$defs", {})
+    try:
+        # pydantic only references its own definitions, which can be inlined
+        # without parsing the references as URIs
+        return {
+            key: _inline_refs(value, defs)
+            for key, value in schema.items()
+            if key != "$defs"
+        }
+    except (KeyError, ValueError):
+        # e.g. recursive models or references outside of `$defs`
+        schema = replace_refs(schema, proxies=False)  # type: ignore
+        return {key: value for key, value in schema.items() if key != "$defs"}
 
 
 def get_name(callable_: Function[..., Any]) -> str:
@@ -164,10 +212,16 @@ def get_schema(callable_: Function[..., Any]) -> FunctionSchema:
     )
 
 
+@cache_hashable(maxsize=VALIDATED_CALLABLE_CACHE_SIZE)
+def _get_validated_callable(func: Function[P, T]) -> Callable[P, T]:
+    # building the validator is by far the most expensive part of a call
+    return validate_call(get_callable(func))
+
+
 def execute_function_call(
     func: Function[..., T], arguments: dict[str, Any]
 ) -> FunctionCallResult[T]:
-    func_with_validation = validate_call(get_callable(func))
+    func_with_validation = _get_validated_callable(func)
     try:
         result = func_with_validation(**arguments)
     except (TypeError, ValidationError) as e:
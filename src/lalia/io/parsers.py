@@ -7,7 +7,7 @@ from contextlib import contextmanager
 from inspect import cleandoc
 from typing import TYPE_CHECKING, Any, Protocol, TypeVar, runtime_checkable
 
-from pydantic import TypeAdapter, ValidationError
+from pydantic import ValidationError
 from ruamel.yaml import YAML
 from ruamel.yaml.error import YAMLError
 
@@ -20,6 +20,7 @@ from lalia.llm.llm import FunctionCallByName
 if TYPE_CHECKING:
     from lalia.llm import LLM
 from lalia.io.logging import get_logger
+from lalia.utils.adapters import get_adapter
 
 logger = get_logger(__name__)
 
@@ -194,7 +195,7 @@ class LLMParser:
         type: builtins.type[T],
         messages: Sequence[Message] = (),
     ) -> tuple[T | None, list[FunctionMessage]]:
-        adapter = TypeAdapter[T](type)
+        adapter = get_adapter(type)
         error_messages: list[FunctionMessage] = []
         parsed = None
 
@@ -222,7 +223,9 @@ class LLMParser:
                         )
                     )
                     error_messages.append(error_message)
-                continue
+                    continue
+                # the payload does not change once it is parsed
+                break
 
             return parsed, error_messages
 
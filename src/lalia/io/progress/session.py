@@ -20,18 +20,18 @@ class SessionProgressState(StrEnum):
     EXECUTING = "executing"  # Session is executing a function
 
 
-@dataclass
+@dataclass(slots=True)
 class IdlingProgress:
     state: Literal[SessionProgressState.IDLE] = SessionProgressState.IDLE
 
 
-@dataclass
+@dataclass(slots=True)
 class GeneratingProgress:
     function: str | None = None
     state: Literal[SessionProgressState.GENERATING] = SessionProgressState.GENERATING
 
 
-@dataclass
+@dataclass(slots=True)
 class ExecutingProgress:
     function: str
     arguments: dict[str, Any] | None = None
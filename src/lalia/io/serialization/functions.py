@@ -3,7 +3,7 @@ from collections.abc import Callable, Sequence
 from types import BuiltinFunctionType, FunctionType
 from typing import Any, ClassVar
 
-from pydantic import TypeAdapter
+from lalia.utils.adapters import get_adapter
 
 
 def is_callable_instance(callable_: object) -> bool:
@@ -118,7 +118,7 @@ def serialize_callable(callable_: Callable[..., Any]) -> dict[str, Any]:
         cls = type(instance)
         name = cls.__qualname__
         module = cls.__module__
-        adapter = TypeAdapter(cls)
+        adapter = get_adapter(cls)
         attributes = adapter.dump_python(instance)
     else:
         name = callable_.__qualname__
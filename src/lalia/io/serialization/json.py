@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import json
+from enum import Enum
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    # orjson serializes enums by their value
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+# the stdlib fallback matches orjson's output, as long as datetimes and dataclasses
+# are passed through to `_default`; floats may still be formatted differently, e.g.
+# `1e16` and `1e+16`, and orjson serializes `nan` and `inf` as `null`
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default)
+
+_INDENTED_ENCODER = json.JSONEncoder(ensure_ascii=False, indent=2, default=_default)
+
+
+def to_json(value: Any, *, indent: bool = False) -> str:
+    """
+    Serializes a value to JSON, using `orjson` if it is installed.
+
+    Enums are serialized by their value, other values that are not JSON
+    serializable are converted to strings. The output is compact unless `indent` is
+    set, which indents with two spaces.
+    """
+    if orjson is not None:
+        option = (
+            orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_PASSTHROUGH_DATETIME
+            | orjson.OPT_PASSTHROUGH_DATACLASS
+        )
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(value, default=_default, option=option).decode()
+        except orjson.JSONEncodeError:
+            # e.g. integers exceeding 64 bits, which the stdlib supports
+            pass
+    if indent:
+        return _INDENTED_ENCODER.encode(value)
+    return _ENCODER.encode(value)
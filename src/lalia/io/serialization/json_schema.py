@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import functools
 import re
 from dataclasses import fields
 from enum import StrEnum
@@ -19,6 +20,12 @@ from lalia.utils.decorators import classproperty
 JSON_SCHEMA_ANY_TAG = "any"
 
 
+@functools.cache
+def _to_snake(value: str) -> str:
+    # the prop discriminators convert the same few keywords on every (de)serialization
+    return to_snake(value)
+
+
 class PropDiscriminator(StrEnum):
     TYPE = "type"
     COMPOSITE = "composite"
@@ -53,7 +60,7 @@ class JsonSchemaComposite(StrEnum):
         return PropDiscriminator.COMPOSITE
 
     def to_snake(self) -> str:
-        return to_snake(self.value)
+        return _to_snake(self.value)
 
 
 class JsonSchemaKeyword(StrEnum):
@@ -80,7 +87,7 @@ class JsonSchemaKeyword(StrEnum):
     REF = "$ref"
 
     def to_snake(self) -> str:
-        return to_snake(self.value).lstrip("$")
+        return _to_snake(self.value).lstrip("$")
 
 
 @dataclass
@@ -6,9 +6,8 @@ from typing import (
     runtime_checkable,
 )
 
-from pydantic import TypeAdapter
-
 from lalia.io.serialization import Serializable
+from lalia.utils.adapters import get_adapter
 
 
 @runtime_checkable
@@ -33,5 +32,5 @@ class DictStorageBackend:
             raise KeyError(f"Could not find '{id_!r}' in {self}")
 
     def save(self, obj: Serializable, id_: Hashable):
-        adapter = TypeAdapter(type(obj))
+        adapter = get_adapter(type(obj))
         self.data[id_] = adapter.dump_python(obj)  # type: ignore
@@ -1,3 +1,4 @@
+import functools
 import json
 import re
 from collections.abc import Callable, Iterator, Sequence
@@ -20,11 +21,19 @@ from lalia.chat.messages.messages import (
 from lalia.chat.messages.tags import Tag, TagPattern
 from lalia.formatting import OpenAIFunctionFormatter
 from lalia.functions import dereference_schema, get_schema
+from lalia.io.serialization.json import to_json
 from lalia.llm.llm import FunctionCallDirective
 from lalia.llm.models import ChatModel
+from lalia.utils.decorators import cache_hashable
 
 DEFAULT_ENCODING = "o200k_base"
 
+TOKEN_COUNT_CACHE_SIZE = 1024
+
+FUNCTION_SCHEMA_CACHE_SIZE = 128
+
+FUNCTION_FORMAT_CACHE_SIZE = 32
+
 
 class Overhead(IntEnum):
     MESSAGE_NAME = -1
@@ -96,6 +105,9 @@ def _iterate_tokens_in_messages(
                 )
 
 
+# the system message, init messages and the conversation so far are counted again
+# on every completion
+@functools.lru_cache(maxsize=TOKEN_COUNT_CACHE_SIZE)
 def count_tokens_in_string(string: str, model: ChatModel = ChatModel.GPT_4O):
     try:
         encoding = tiktoken.encoding_for_model(model)
@@ -122,27 +134,40 @@ def calculate_tokens_in_messages(
     return sum(_iterate_tokens_in_messages(messages, model)) + Overhead.COMPLETION
 
 
+@cache_hashable(maxsize=FUNCTION_SCHEMA_CACHE_SIZE)
+def _get_serialized_function_schema(function: Callable[..., Any]) -> str:
+    return to_json(get_schema(function).dereference_schema().to_dict())
+
+
+@functools.lru_cache(maxsize=FUNCTION_FORMAT_CACHE_SIZE)
+def _format_function_schemas(serialized_schemas: tuple[str, ...]) -> str:
+    formatter = OpenAIFunctionFormatter()
+    return formatter.format([json.loads(schema) for schema in serialized_schemas])
+
+
 def calculate_tokens_in_functions(
     functions: Sequence[Callable[..., Any] | dict[str, Any]],
     model: ChatModel = ChatModel.GPT_4O,
 ) -> int:
     if not functions:
         return 0
-    function_schemas = []
+    # the functions of a session rarely change between completions, so the
+    # formatted namespace is cached by the serialized schemas
+    serialized_schemas = []
     for function in functions:
         match function:
             case Callable():
-                function_schema = get_schema(function).dereference_schema()
+                serialized_schema = _get_serialized_function_schema(function)
             case dict() as function_schema:
                 function_schema["parameters"] = dereference_schema(
                     function_schema["parameters"]
                 )
+                serialized_schema = to_json(function_schema)
             case _:
                 raise ValueError("Input must be either a Callable or a dictionary")
-        function_schemas.append(function_schema)
+        serialized_schemas.append(serialized_schema)
 
-    formatter = OpenAIFunctionFormatter()
-    functions_formatted = formatter.format(function_schemas)
+    functions_formatted = _format_function_schemas(tuple(serialized_schemas))
     return get_tokens(functions_formatted, model=model)
 
 
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import operator
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, MutableMapping, Sequence
+from typing import Any
+
+from pydantic.dataclasses import dataclass
+
+DEFAULT_MAXSIZE = 256
+
+DEFAULT_TTL = 600.0
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+
+
+def _normalize(vector: Sequence[float]) -> list[float]:
+    norm = math.sqrt(math.fsum(value * value for value in vector))
+    if norm == 0:
+        return list(vector)
+    return [value / norm for value in vector]
+
+
+def _dot(a: Sequence[float], b: Sequence[float]) -> float:
+    return math.fsum(map(operator.mul, a, b))
+
+
+@dataclass
+class CacheStats:
+    """
+    Counts the requests that were looked up in a response cache.
+
+    `cached_tokens` are the total tokens of the responses served from a cache.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    cached_tokens: int = 0
+
+
+def get_request_key(request: dict[str, Any]) -> str:
+    """
+    Derives a cache key from a raw chat completion request.
+    """
+    canonical = json.dumps(request, sort_keys=True, default=str)
+    return hashlib.blake2b(canonical.encode(), digest_size=32).hexdigest()
+
+
+@dataclass
+class ResponseCache(MutableMapping[str, dict[str, Any]]):
+    """
+    An in-memory LRU cache for raw chat completion responses with a time to live.
+
+    Any other `MutableMapping`, e.g. a `dict` or a mapping backed by a database,
+    can be used as a response cache as well. The cache can be shared between
+    threads.
+    """
+
+    maxsize: int = DEFAULT_MAXSIZE
+    ttl: float = DEFAULT_TTL
+
+    def __post_init__(self):
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key: str) -> dict[str, Any]:
+        with self._lock:
+            expires, response = self._entries[key]
+            if expires < time.monotonic():
+                del self._entries[key]
+                raise KeyError(key)
+            self._entries.move_to_end(key)
+            return response
+
+    def __setitem__(self, key: str, response: dict[str, Any]):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __delitem__(self, key: str):
+        with self._lock:
+            del self._entries[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+@dataclass
+class SemanticCache:
+    """
+    An in-memory cache for raw chat completion responses keyed by the embedding of
+    the last user message.
+
+    A response is returned if the cosine similarity between the embeddings exceeds
+    `threshold` and the rest of the request, given by `context`, matches exactly.
+    `embed` is called at most once per text, e.g. for a lookup followed by an insert.
+    The cache can be shared between threads.
+    """
+
+    embed: Callable[[str], Sequence[float]]
+    threshold: float = DEFAULT_SIMILARITY_THRESHOLD
+    maxsize: int = DEFAULT_MAXSIZE
+
+    def __post_init__(self):
+        self._entries: OrderedDict[
+            tuple[str, str], tuple[list[float], dict[str, Any]]
+        ] = OrderedDict()
+        self._last_embedding: tuple[str, list[float]] | None = None
+        self._lock = threading.Lock()
+
+    def _get_embedding(self, text: str) -> list[float]:
+        # other threads may replace the last embedding, so it is only read once
+        last_embedding = self._last_embedding
+        if last_embedding is not None and last_embedding[0] == text:
+            return last_embedding[1]
+        # embedding is slow, e.g. a request, so it is done without holding the lock
+        embedding = _normalize(self.embed(text))
+        self._last_embedding = (text, embedding)
+        return embedding
+
+    def lookup(self, text: str, context: str = "") -> dict[str, Any] | None:
+        with self._lock:
+            if (entry := self._entries.get((context, text))) is not None:
+                self._entries.move_to_end((context, text))
+                return entry[1]
+
+        embedding = self._get_embedding(text)
+        with self._lock:
+            best_key, best_similarity = None, self.threshold
+            for key, (other, _) in self._entries.items():
+                if key[0] != context:
+                    continue
+                if (similarity := _dot(embedding, other)) >= best_similarity:
+                    best_key, best_similarity = key, similarity
+
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            return self._entries[best_key][1]
+
+    def insert(self, text: str, response: dict[str, Any], context: str = ""):
+        embedding = self._get_embedding(text)
+        with self._lock:
+            self._entries[(context, text)] = (embedding, response)
+            self._entries.move_to_end((context, text))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._last_embedding = None
@@ -4,6 +4,8 @@ from datetime import datetime
 from enum import StrEnum
 from typing import Any, ParamSpec, Protocol, TypeVar, runtime_checkable
 
+from pydantic.dataclasses import dataclass
+
 if sys.version_info < (3, 12):
     from typing_extensions import TypedDict
 else:
@@ -44,8 +46,10 @@ class CompleteKwargs(TypedDict, total=False):
     max_tokens: int | None
     n_choices: int
     presence_penalty: float | None
+    prompt_cache_key: str | None
     seed: int | None
     stop: str | Sequence[str] | None
+    stream: bool
     temperature: float | None
     top_p: float | None
     user: str | None
@@ -74,6 +78,15 @@ class ChatCompletionObject(StrEnum):
     CHAT_COMPLETION = "chat.completion"
 
 
+@dataclass
+class Usage:
+    prompt: int
+    completion: int
+    total: int
+    # prompt tokens served from the provider's prompt cache
+    cached: int = 0
+
+
 @runtime_checkable
 class ChatCompletionResponse(Protocol):
     id: str
@@ -101,10 +114,11 @@ class LLM(Protocol):
         max_tokens: int | None = None,
         n_choices: int = 1,
         presence_penalty: float | None = None,
+        prompt_cache_key: str | None = None,
         # response_format: ResponseFormat | None = None # NOT SUPPORTED
         seed: int | None = None,
         stop: str | Sequence[str] | None = None,
-        # stream: bool = False, # NOT SUPPORTED
+        stream: bool = False,  # noqa: FBT001, FBT002
         temperature: float | None = None,
         # tools: Sequence[Tool] | None = None, # NOT SUPPORTED
         # tool_choice: ToolChoice | None = None, # NOT SUPPORTED
@@ -1,14 +1,19 @@
+import copy
 import functools
+import logging
 import os
-from collections.abc import Callable, Sequence
+import threading
+from collections.abc import Callable, Iterable, MutableMapping, Sequence
 from dataclasses import InitVar, field
 from datetime import UTC, datetime
 from typing import Any, ParamSpec, TypeVar, Unpack
 
 from openai import OpenAI
 from pydantic import (
+    BaseModel,
     ConfigDict,
     Field,
+    InstanceOf,
     TypeAdapter,
     create_model,
     model_validator,
@@ -27,19 +32,24 @@ from lalia.llm.budgeting.token_counter import (
     calculate_tokens,
     truncate_messages,
 )
+from lalia.llm.cache import CacheStats, SemanticCache, get_request_key
 from lalia.llm.llm import (
     CallKwargs,
     ChatCompletionObject,
     FunctionCallByName,
     FunctionCallDirective,
+    Usage,
     Wrapped,
 )
 from lalia.llm.models import ChatModel
+from lalia.utils.decorators import cache_hashable
 
 FAILURE_QUERY = "What went wrong? Do I need to provide more information?"
 
 COMPLETION_BUFFER = 450
 
+FUNCTION_SCHEMA_CACHE_SIZE = 128
+
 logger = get_logger(__name__)
 
 R_co = TypeVar("R_co", covariant=True)
@@ -102,6 +112,37 @@ def _to_open_ai_raw_function_schemas(
     return [_to_open_ai_raw_function_schema(func) for func in funcs]
 
 
+@cache_hashable(maxsize=FUNCTION_SCHEMA_CACHE_SIZE)
+def _get_cached_raw_function_schemas(
+    funcs: tuple[Callable[..., Any], ...],
+) -> list[dict[str, Any]]:
+    return _to_open_ai_raw_function_schemas(funcs)
+
+
+@cache_hashable(maxsize=FUNCTION_SCHEMA_CACHE_SIZE)
+def _get_arguments_model(func: Callable[..., Any]) -> type[BaseModel]:
+    return create_model(
+        f"{get_name(func)}_response",
+        **{
+            name: (type_, ...)
+            for name, type_ in func.__annotations__.items()
+            if name != "return"
+        },
+    )
+
+
+def _get_raw_function_schemas(
+    funcs: (
+        Sequence[Callable[..., Any]]
+        | Sequence[FunctionSchema]
+        | Sequence[dict[str, Any]]
+    ),
+) -> list[dict[str, Any]]:
+    schemas = _get_cached_raw_function_schemas(tuple(funcs))
+    # the schemas are dereferenced in place when counting tokens
+    return copy.deepcopy(schemas)
+
+
 def _truncate_raw_messages(
     messages: Sequence[dict[str, Any]],
     model: ChatModel,
@@ -122,31 +163,86 @@ def _truncate_raw_messages(
         message for message in messages if message["role"] not in exlude_roles
     ]
 
+    retained = truncate_messages(
+        messages=to_truncate,
+        token_threshold=_get_model_context_window(model) - excluded_messages_tokens,
+        completion_buffer=completion_buffer,
+        functions=functions,
+    )
+    retained_ids = {id(message) for message in retained}
+
+    # keep the original order, so that the request shares its prefix with previous
+    # ones (e.g. for prompt caching) and late system messages stay in place
     messages_truncated = [
-        *excluded_messages,
-        *truncate_messages(
-            messages=to_truncate,
-            token_threshold=_get_model_context_window(model) - excluded_messages_tokens,
-            completion_buffer=completion_buffer,
-            functions=functions,
-        ),
+        message
+        for message in messages
+        if message["role"] in exlude_roles or id(message) in retained_ids
     ]
 
-    logger.debug(
-        f"Truncated {len(list(messages))} messages with "
-        f"{calculate_tokens(messages, functions, model=model)} tokens to "
-        f"{len(messages_truncated)} messages with "
-        f"{calculate_tokens(messages_truncated, functions, model=model)} tokens."
-    )
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            f"Truncated {len(list(messages))} messages with "
+            f"{calculate_tokens(messages, functions, model=model)} tokens to "
+            f"{len(messages_truncated)} messages with "
+            f"{calculate_tokens(messages_truncated, functions, model=model)} tokens."
+        )
 
     return messages_truncated
 
 
-@dataclass
-class Usage:
-    prompt: int
-    completion: int
-    total: int
+def _assemble_raw_response(
+    chunks: Iterable[dict[str, Any]],
+    stream_handler: Callable[[int, str], None] | None = None,
+) -> dict[str, Any]:
+    """
+    Assembles the chunks of a streamed chat completion into a raw response.
+
+    The `stream_handler` receives the choice index and the content of each chunk as
+    soon as it arrives.
+    """
+    raw_response: dict[str, Any] = {
+        "object": ChatCompletionObject.CHAT_COMPLETION,
+        "usage": {},
+    }
+    choices: dict[int, dict[str, Any]] = {}
+
+    for chunk in chunks:
+        raw_response["id"] = chunk["id"]
+        raw_response["created"] = chunk["created"]
+        raw_response["model"] = chunk["model"]
+        if chunk.get("usage"):
+            raw_response["usage"] = chunk["usage"]
+
+        for chunk_choice in chunk["choices"]:
+            index = chunk_choice["index"]
+            choice = choices.setdefault(
+                index,
+                {
+                    "index": index,
+                    "message": {"role": "assistant", "content": None},
+                    "finish_reason": None,
+                },
+            )
+            message, delta = choice["message"], chunk_choice["delta"]
+
+            if delta.get("content") is not None:
+                message["content"] = (message["content"] or "") + delta["content"]
+                if stream_handler is not None:
+                    stream_handler(index, delta["content"])
+
+            if (function_call := delta.get("function_call")) is not None:
+                assembled = message.setdefault(
+                    "function_call", {"name": "", "arguments": ""}
+                )
+                for key in ("name", "arguments"):
+                    if function_call.get(key):
+                        assembled[key] += function_call[key]
+
+            if chunk_choice.get("finish_reason") is not None:
+                choice["finish_reason"] = chunk_choice["finish_reason"]
+
+    raw_response["choices"] = [choices[index] for index in sorted(choices)]
+    return raw_response
 
 
 @dataclass
@@ -170,12 +266,21 @@ class OpenAIChat:
     temperature: float = 1.0
     max_retries: int = 5
     parser: Parser | None = Field(default=None, exclude=True)
+    http_client: Any = Field(default=None, exclude=True)
+    stream_handler: Callable[[int, str], None] | None = Field(
+        default=None, exclude=True
+    )
     failure_messages: list[Message] = field(
         default_factory=lambda: [
             UserMessage(FAILURE_QUERY),
         ]
     )
     completion_buffer: int = COMPLETION_BUFFER
+    cache: InstanceOf[MutableMapping[str, dict[str, Any]]] | None = Field(
+        default=None, exclude=True
+    )
+    semantic_cache: InstanceOf[SemanticCache] | None = Field(default=None, exclude=True)
+    prompt_cache_key: str | None = None
 
     @model_validator(mode="before")
     @classmethod
@@ -204,8 +309,41 @@ class OpenAIChat:
                     "No OpenAI API key provided, either `api_key` or environment "
                     "variable `OPENAI_API_KEY` must be set."
                 )
-        self._client = OpenAI(api_key=api_key)
+        # the client keeps its connections alive, a shared `http_client` also shares
+        # the connection pool, e.g. with the parser's llm
+        self._client = OpenAI(api_key=api_key, http_client=self.http_client)
         self._responses: list[dict[str, Any]] = []
+        self._usage = Usage(prompt=0, completion=0, total=0)
+        self._cache_stats = CacheStats()
+        # sessions completed concurrently may share the llm
+        self._lock = threading.Lock()
+
+    def _add_response(self, raw_response: dict[str, Any]):
+        usage = raw_response["usage"]
+        prompt_tokens_details = usage.get("prompt_tokens_details") or {}
+        with self._lock:
+            self._responses.append(raw_response)
+            self._usage.prompt += usage.get("prompt_tokens", 0)
+            self._usage.completion += usage.get("completion_tokens", 0)
+            self._usage.total += usage.get("total_tokens", 0)
+            self._usage.cached += prompt_tokens_details.get("cached_tokens") or 0
+
+    def _get_cached_response(
+        self, cached_response: dict[str, Any], *, stream: bool = False
+    ) -> dict[str, Any]:
+        logger.debug(cached_response)
+        if stream and self.stream_handler is not None:
+            # replay the cached contents as if they were streamed in one chunk
+            for choice in cached_response["choices"]:
+                if (content := choice["message"].get("content")) is not None:
+                    self.stream_handler(choice["index"], content)
+        with self._lock:
+            self._cache_stats.hits += 1
+            self._cache_stats.cached_tokens += cached_response.get("usage", {}).get(
+                "total_tokens", 0
+            )
+        # responses are mutated downstream, e.g. when parsing function calls
+        return copy.deepcopy(cached_response)
 
     def _complete_failure(self, messages: Sequence[Message]) -> ChatCompletionResponse:
         messages = list(messages)
@@ -235,19 +373,15 @@ class OpenAIChat:
     ) -> dict[str, Any]:
         if self.parser is None:
             return response
-        function_call = response["choices"][0]["message"].get("function_call")
-        if function_call is not None:
+        functions_by_name = {get_name(func): func for func in functions}
+        for choice in response["choices"]:
+            function_call = choice["message"].get("function_call")
+            if function_call is None:
+                continue
             name = function_call["name"]
             payload = function_call["arguments"]
-            func = next(func for func in functions if get_name(func) == name)
-            response_model = create_model(
-                f"{name}_response",
-                **{
-                    name: (type_, ...)
-                    for name, type_ in func.__annotations__.items()
-                    if name != "return"
-                },
-            )
+            func = functions_by_name[name]
+            response_model = _get_arguments_model(func)
             args, parsing_error_messages = self.parser.parse(
                 payload=payload,
                 type=response_model,
@@ -257,9 +391,7 @@ class OpenAIChat:
             function_call["arguments"] = dict(args) if args else None
             function_call["context"] = context or set()
             function_call["parsing_error_messages"] = parsing_error_messages
-            return response
-        else:
-            return response
+        return response
 
     def call(
         self,
@@ -312,6 +444,31 @@ class OpenAIChat:
 
         return decorator
 
+    @property
+    def cache_stats(self) -> CacheStats:
+        """
+        The hits and misses of the response caches so far.
+        """
+        with self._lock:
+            return CacheStats(
+                hits=self._cache_stats.hits,
+                misses=self._cache_stats.misses,
+                cached_tokens=self._cache_stats.cached_tokens,
+            )
+
+    @property
+    def usage(self) -> Usage:
+        """
+        The tokens used by all completions so far.
+        """
+        with self._lock:
+            return Usage(
+                prompt=self._usage.prompt,
+                completion=self._usage.completion,
+                total=self._usage.total,
+                cached=self._usage.cached,
+            )
+
     def complete(
         self,
         messages: Sequence[Message],
@@ -325,10 +482,11 @@ class OpenAIChat:
         max_tokens: int | None = None,
         n_choices: int = 1,
         presence_penalty: float | None = None,
+        prompt_cache_key: str | None = None,
         # response_format: ResponseFormat | None = None # NOT SUPPORTED
         seed: int | None = None,
         stop: str | Sequence[str] | None = None,
-        # stream: bool = False, # NOT SUPPORTED
+        stream: bool = False,  # noqa: FBT001, FBT002
         temperature: float | None = None,
         # tools: Sequence[Tool] | None = None, # NOT SUPPORTED
         # tool_choice: ToolChoice | None = None, # NOT SUPPORTED
@@ -341,7 +499,7 @@ class OpenAIChat:
         if model is None:
             model = self.model
 
-        func_schemas = _to_open_ai_raw_function_schemas(functions)
+        func_schemas = _get_raw_function_schemas(functions)
 
         raw_response = self._complete_raw(
             messages=messages,
@@ -352,8 +510,10 @@ class OpenAIChat:
             max_tokens=max_tokens,
             n_choices=n_choices,
             presence_penalty=presence_penalty,
+            prompt_cache_key=prompt_cache_key,
             seed=seed,
             stop=stop,
+            stream=stream,
             temperature=temperature,
             top_p=top_p,
             user=user,
@@ -381,10 +541,11 @@ class OpenAIChat:
         max_tokens: int | None = None,
         n_choices: int = 1,
         presence_penalty: float | None = None,
+        prompt_cache_key: str | None = None,
         # response_format: ResponseFormat | None = None # NOT SUPPORTED
         seed: int | None = None,
         stop: str | Sequence[str] | None = None,
-        # stream: bool = False, # NOT SUPPORTED
+        stream: bool = False,  # noqa: FBT001, FBT002
         temperature: float | None = None,
         # tools: Sequence[Tool] | None = None, # NOT SUPPORTED
         # tool_choice: ToolChoice | None = None, # NOT SUPPORTED
@@ -437,11 +598,70 @@ class OpenAIChat:
         if user is not None:
             kwargs["user"] = user
 
-        raw_response = self._client.chat.completions.create(**kwargs).model_dump()
+        if prompt_cache_key is None:
+            prompt_cache_key = self.prompt_cache_key
+        if prompt_cache_key is not None:
+            # older clients don't accept `prompt_cache_key` as a keyword argument
+            kwargs["extra_body"] = {"prompt_cache_key": prompt_cache_key}
+
+        cache_key = None
+        # only deterministic requests are served from the cache
+        if self.cache is not None and temperature == 0:
+            cache_key = get_request_key(
+                {key: value for key, value in kwargs.items() if key != "timeout"}
+            )
+            if (cached_response := self.cache.get(cache_key)) is not None:
+                return self._get_cached_response(cached_response, stream=stream)
+
+        semantic_key = None
+        last_message = messages_truncated[-1] if messages_truncated else {}
+        if (
+            self.semantic_cache is not None
+            and temperature == 0
+            and last_message.get("role") == "user"
+            and isinstance(last_message.get("content"), str)
+        ):
+            # paraphrased prompts only match if the rest of the request is the same
+            semantic_key = get_request_key(
+                {
+                    **{key: value for key, value in kwargs.items() if key != "timeout"},
+                    "messages": messages_truncated[:-1],
+                }
+            )
+            cached_response = self.semantic_cache.lookup(
+                last_message["content"], context=semantic_key
+            )
+            if cached_response is not None:
+                return self._get_cached_response(cached_response, stream=stream)
+
+        if cache_key is not None or semantic_key is not None:
+            with self._lock:
+                self._cache_stats.misses += 1
+
+        if stream:
+            # the assembled response is the same as for a non-streamed request
+            chunks = self._client.chat.completions.create(
+                **kwargs, stream=True, stream_options={"include_usage": True}
+            )
+            raw_response = _assemble_raw_response(
+                (chunk.model_dump() for chunk in chunks), self.stream_handler
+            )
+        else:
+            raw_response = self._client.chat.completions.create(**kwargs).model_dump()
 
         logger.debug(kwargs)
         logger.debug(raw_response)
 
-        self._responses.append(raw_response)
+        self._add_response(raw_response)
+
+        if self.cache is not None and cache_key is not None:
+            self.cache[cache_key] = copy.deepcopy(raw_response)
+
+        if self.semantic_cache is not None and semantic_key is not None:
+            self.semantic_cache.insert(
+                last_message["content"],
+                copy.deepcopy(raw_response),
+                context=semantic_key,
+            )
 
         return raw_response
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from typing import TypeVar
+
+from pydantic import TypeAdapter
+
+from lalia.utils.decorators import cache_hashable
+
+ADAPTER_CACHE_SIZE = 128
+
+T = TypeVar("T")
+
+
+@cache_hashable(maxsize=ADAPTER_CACHE_SIZE)
+def get_adapter(type_: type[T]) -> TypeAdapter[T]:
+    """
+    Returns a shared adapter for `type_`, as building adapters is expensive.
+    """
+    return TypeAdapter(type_)
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 from collections.abc import Callable
-from functools import update_wrapper, wraps
-from typing import TYPE_CHECKING, Generic, TypeVar, cast
+from functools import lru_cache, update_wrapper, wraps
+from typing import TYPE_CHECKING, Generic, ParamSpec, TypeVar, cast
 
 T = TypeVar("T")
 RT = TypeVar("RT")
+P = ParamSpec("P")
 
 
 class _Classproperty(Generic[T, RT]):
@@ -46,6 +47,37 @@ class _Classproperty(Generic[T, RT]):
         return self.__wrapped__(*args, **kwargs)
 
 
+def cache_hashable(
+    maxsize: int | None = 128,
+) -> Callable[[Callable[P, RT]], Callable[P, RT]]:
+    """
+    Caches the results of a function like `functools.lru_cache`.
+
+    Calls with unhashable arguments, e.g. callable instances defining `__eq__`,
+    bypass the cache instead of raising a `TypeError`.
+    """
+
+    def decorator(func: Callable[P, RT]) -> Callable[P, RT]:
+        cached = lru_cache(maxsize=maxsize)(func)
+
+        @wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> RT:
+            try:
+                return cached(*args, **kwargs)
+            except TypeError:
+                try:
+                    hash((args, tuple(kwargs.items())))
+                except TypeError:
+                    return func(*args, **kwargs)
+                raise
+
+        wrapper.cache_info = cached.cache_info  # type: ignore[attr-defined]
+        wrapper.cache_clear = cached.cache_clear  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
+
+
 if TYPE_CHECKING:
 
     def mock(func: Callable[[T], RT]):
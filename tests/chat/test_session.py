@@ -0,0 +1,165 @@
+import pytest
+
+from lalia.chat.completions import Choice
+from lalia.chat.finish_reason import FinishReason
+from lalia.chat.messages import (
+    AssistantMessage,
+    FunctionCall,
+    FunctionMessage,
+    SystemMessage,
+    UserMessage,
+)
+from lalia.chat.session import Session
+from lalia.io.progress import ProgressManager
+from lalia.io.progress.session import ExecutingProgress
+from lalia.llm.openai import OpenAIChat
+
+
+class ProgressRecorder:
+    def __init__(self):
+        self.progresses = []
+
+    def emit(self, progress):
+        self.progresses.append(progress)
+
+
+@pytest.fixture()
+def session():
+    return Session(llm=OpenAIChat(api_key="fake_api_key"), system_message="Hi!")
+
+
+def test_complete_flows_rejects_duplicate_sessions(session):
+    with pytest.raises(ValueError, match="distinct"):
+        Session.complete_flows(
+            [session, session], [UserMessage("Ahoy!"), UserMessage("Arrr!")]
+        )
+
+
+def test_limit_messages_within_memory(session):
+    session.memory = 3
+    messages = [
+        SystemMessage("You are a pirate."),
+        UserMessage("Ahoy!"),
+        AssistantMessage("Arrr!"),
+        UserMessage("Where is the treasure?"),
+    ]
+
+    assert session._limit_messages(messages) == messages
+    assert session._limit_messages(messages[1:]) == messages[1:]
+
+
+def test_limit_messages_keeps_system_message(session):
+    session.memory = 2
+    messages = [
+        SystemMessage("You are a pirate."),
+        UserMessage("Ahoy!"),
+        AssistantMessage("Arrr!"),
+        UserMessage("Where is the treasure?"),
+    ]
+
+    assert session._limit_messages(messages) == [messages[0], *messages[2:]]
+    assert session._limit_messages(messages[1:]) == messages[2:]
+
+
+def test_limit_messages_drops_leading_function_messages(session):
+    session.memory = 2
+    messages = [
+        SystemMessage("You are a pirate."),
+        UserMessage("Where is the treasure?"),
+        AssistantMessage(function_call=FunctionCall(name="dig", arguments={})),
+        FunctionMessage(content="A chest!", name="dig"),
+        AssistantMessage("Arrr, a chest!"),
+    ]
+
+    # the function message would start the window without its function call
+    assert session._limit_messages(messages) == [messages[0], messages[-1]]
+
+
+def multiply(a: int, b: int) -> int:
+    """
+    Multiplies two numbers.
+    """
+    return a * b
+
+
+def divide(a: int, b: int) -> int:
+    """
+    Divides two numbers.
+    """
+    return a // b
+
+
+def function_call_choice(index: int, function=multiply, **arguments: int) -> Choice:
+    return Choice(
+        index=index,
+        message=AssistantMessage(
+            function_call=FunctionCall(
+                name=function.__name__, arguments=arguments, function=function
+            )
+        ),
+        finish_reason=FinishReason.FUNCTION_CALL,
+    )
+
+
+def test_execute_function_calls_in_choice_order(session):
+    choices = [
+        function_call_choice(0, a=2, b=3),
+        Choice(
+            index=1,
+            message=AssistantMessage("Arrr!"),
+            finish_reason=FinishReason.STOP,
+        ),
+        function_call_choice(2, a=4, b=5),
+    ]
+
+    results = session._execute_function_calls(choices)
+
+    assert [None if result is None else result.value for result in results] == [
+        6,
+        None,
+        20,
+    ]
+
+
+def test_execute_function_calls_skips_single_call(session):
+    # a single function call is executed when its choice is handled
+    assert session._execute_function_calls([function_call_choice(0, a=2, b=3)]) == [
+        None
+    ]
+
+
+def test_execute_function_calls_emits_progress(session):
+    recorder = ProgressRecorder()
+    session.progress_manager = ProgressManager(handler=recorder)
+    choices = [function_call_choice(0, a=2, b=3), function_call_choice(1, a=4, b=5)]
+
+    session._execute_function_calls(choices)
+
+    assert sorted(
+        (progress.function, progress.arguments["a"])
+        for progress in recorder.progresses
+        if isinstance(progress, ExecutingProgress)
+    ) == [("multiply", 2), ("multiply", 4)]
+
+
+def test_execute_function_calls_with_failing_call(session):
+    executed = []
+
+    def record(a: int, b: int) -> int:
+        """
+        Records a call.
+        """
+        executed.append((a, b))
+        return a + b
+
+    choices = [
+        function_call_choice(0, record, a=1, b=2),
+        function_call_choice(1, divide, a=1, b=0),
+        function_call_choice(2, record, a=3, b=4),
+    ]
+
+    with pytest.raises(ZeroDivisionError):
+        session._execute_function_calls(choices)
+
+    # the other calls are not cancelled
+    assert sorted(executed) == [(1, 2), (3, 4)]
@@ -1,6 +1,13 @@
 import pytest
 
-from lalia.functions import FunctionSchema, get_callable, get_name, get_schema
+from lalia.functions import (
+    FunctionSchema,
+    dereference_schema,
+    execute_function_call,
+    get_callable,
+    get_name,
+    get_schema,
+)
 from lalia.io.serialization.json_schema import (
     AllOfProp,
     AnyOfProp,
@@ -76,3 +83,72 @@ def test_get_schema(foo_function, foo_schema_expected):
     non_callable = "I am not callable"
     with pytest.raises(ValueError):
         get_schema(non_callable)
+
+
+def test_dereference_schema():
+    schema = {
+        "type": "object",
+        "properties": {"point": {"$ref": "#/$defs/Point"}},
+        "$defs": {
+            "Point": {"type": "object", "properties": {"x": {"type": "integer"}}}
+        },
+    }
+
+    assert dereference_schema(schema) == {
+        "type": "object",
+        "properties": {
+            "point": {"type": "object", "properties": {"x": {"type": "integer"}}}
+        },
+    }
+
+
+def test_dereference_schema_without_refs():
+    schema = {
+        "type": "object",
+        "properties": {"tags": {"type": "array", "items": {"type": "string"}}},
+        "$defs": {"Unused": {"type": "string"}},
+    }
+
+    assert dereference_schema(schema) == {
+        "type": "object",
+        "properties": {"tags": {"type": "array", "items": {"type": "string"}}},
+    }
+
+
+def test_dereference_schema_with_other_refs():
+    schema = {
+        "type": "object",
+        "properties": {"x": {"$ref": "#/definitions/X"}},
+        "definitions": {"X": {"type": "integer"}},
+    }
+
+    assert dereference_schema(schema) == {
+        "type": "object",
+        "properties": {"x": {"type": "integer"}},
+        "definitions": {"X": {"type": "integer"}},
+    }
+
+
+def test_execute_function_call_validates_arguments():
+    def add(a: int, b: int = 2) -> int:
+        return a + b
+
+    # the validating wrapper is reused across calls
+    for _ in range(2):
+        assert execute_function_call(add, {"a": "3"}).value == 5
+        assert execute_function_call(add, {"a": "x"}).error is not None
+
+
+def test_execute_function_call_with_unhashable_callable():
+    class Multiplier:  # noqa: PLW1641
+        def __init__(self, factor: int):
+            self.factor = factor
+
+        def __eq__(self, other: object) -> bool:
+            return isinstance(other, Multiplier) and other.factor == self.factor
+
+        def __call__(self, x: int) -> int:
+            return self.factor * x
+
+    # unhashable callables bypass the cache
+    assert execute_function_call(Multiplier(3), {"x": "2"}).value == 6
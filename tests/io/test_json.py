@@ -0,0 +1,59 @@
+import json
+from dataclasses import dataclass
+from datetime import UTC, date, datetime
+from enum import Enum
+
+import pytest
+
+from lalia.io.serialization import json as json_serialization
+from lalia.io.serialization.json import to_json
+
+
+class Color(Enum):
+    RED = "red"
+
+
+class Size(int, Enum):
+    LARGE = 3
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+VALUES = [
+    {"results": [1, 2.5, {"nested": None}], "ok": True, "name": "Zoë"},
+    {1: "non-string key"},
+    [2**70],
+    {"date": date(2024, 1, 1)},
+    {"datetime": datetime(2024, 1, 1, 12, 30, tzinfo=UTC)},
+    {"point": Point(1, 2)},
+    {"size": Size.LARGE},
+    [],
+]
+
+
+@pytest.fixture(params=["orjson", "stdlib"], autouse=True)
+def serializer(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(json_serialization, "orjson", None)
+    elif json_serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_to_json_matches_stdlib(value):
+    expected = json.dumps(value, indent=2, default=str, ensure_ascii=False)
+    assert to_json(value, indent=True) == expected
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_to_json_is_compact(value):
+    expected = json.dumps(value, separators=(",", ":"), default=str, ensure_ascii=False)
+    assert to_json(value) == expected
+
+
+def test_to_json_serializes_enums_by_value():
+    assert to_json({"color": Color.RED}) == '{"color":"red"}'
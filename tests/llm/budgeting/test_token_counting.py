@@ -7,6 +7,7 @@ from lalia.chat.messages.messages import (
     UserMessage,
 )
 from lalia.chat.session import Session
+from lalia.functions import get_schema
 from lalia.llm.budgeting.token_counter import (
     count_tokens_in_string,
     calculate_tokens,
@@ -74,6 +75,10 @@ class TestFunctionTokenCounting:
     def test_function_tokens(self, foo_function):
         assert calculate_tokens_in_functions([foo_function]) == 95
 
+    def test_function_tokens_from_schema(self, foo_function):
+        schema = get_schema(foo_function).to_dict()
+        assert calculate_tokens_in_functions([schema]) == 95
+
     @pytest.mark.openai
     @pytest.mark.exact_tokens
     def test_llm_api_response_to_estimation_exactly(
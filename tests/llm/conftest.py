@@ -1,7 +1,7 @@
 import json
 import random
 import warnings
-from collections.abc import Sequence
+from collections.abc import Iterator, Sequence
 from inspect import cleandoc
 from typing import Any, cast
 
@@ -11,7 +11,7 @@ from hypothesis.errors import (
     HypothesisSideeffectWarning,
     NonInteractiveExampleWarning,
 )
-from openai.types.chat import ChatCompletion
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
 
 with warnings.catch_warnings():
     warnings.filterwarnings("ignore", category=HypothesisSideeffectWarning)
@@ -151,9 +151,48 @@ def get_function_to_call(
     raise ValueError(f"Invalid function call directive: {function_call}")
 
 
+def stream_chunks(
+    completion: ChatCompletion, *, include_usage: bool = False
+) -> Iterator[ChatCompletionChunk]:
+    def chunk(choices: list[dict[str, Any]], usage: Any = None) -> ChatCompletionChunk:
+        return ChatCompletionChunk(
+            id=completion.id,
+            object="chat.completion.chunk",
+            created=completion.created,
+            model=completion.model,
+            choices=choices,
+            usage=usage,
+        )
+
+    for choice in completion.choices:
+        index, message = choice.index, choice.message
+        if message.content is not None:
+            # the content is streamed word by word
+            for i, word in enumerate(message.content.split(" ")):
+                content = word if i == 0 else f" {word}"
+                yield chunk([{"index": index, "delta": {"content": content}}])
+        if message.function_call is not None:
+            name, arguments = (
+                message.function_call.name,
+                message.function_call.arguments,
+            )
+            yield chunk([{"index": index, "delta": {"function_call": {"name": name}}}])
+            yield chunk(
+                [{"index": index, "delta": {"function_call": {"arguments": arguments}}}]
+            )
+        yield chunk(
+            [{"index": index, "delta": {}, "finish_reason": choice.finish_reason}]
+        )
+
+    if include_usage:
+        yield chunk([], usage=completion.usage)
+
+
 @dataclass
 class FakeOpenAICompletions:
     _hypothesis_func_call_args: st.SearchStrategy | None = None
+    # the extra body of the last request
+    extra_body: dict[str, Any] | None = None
 
     def create(
         self,
@@ -170,14 +209,17 @@ class FakeOpenAICompletions:
         # response_format: ResponseFormat | None = None # NOT SUPPORTED
         seed: int | None = None,
         stop: str | Sequence[str] | None = None,
-        # stream: bool = False, # NOT SUPPORTED
+        stream: bool = False,  # noqa: FBT001, FBT002
+        stream_options: dict[str, Any] | None = None,
         temperature: float | None = None,
         # tools: Sequence[Tool] | None = None, # NOT SUPPORTED
         # tool_choice: ToolChoice | None = None, # NOT SUPPORTED
         top_p: float | None = None,
         user: str | None = None,
         timeout: int | None = None,
-    ) -> ChatCompletion:
+        extra_body: dict[str, Any] | None = None,
+    ) -> ChatCompletion | Iterator[ChatCompletionChunk]:
+        self.extra_body = extra_body
         if functions and function_call is not FunctionCallDirective.NONE:
             func = get_function_to_call(functions, function_call)
             if self._hypothesis_func_call_args is None:
@@ -197,7 +239,7 @@ class FakeOpenAICompletions:
             content_response = cleandoc(random.choice(AI_QUOTES))  # noqa
             finish_reason = FinishReason.STOP
 
-        return ChatCompletion(
+        completion = ChatCompletion(
             **{
                 "id": "fake_id",
                 "object": "chat.completion",
@@ -223,6 +265,11 @@ class FakeOpenAICompletions:
             }
         )
 
+        if stream:
+            include_usage = bool(stream_options and stream_options.get("include_usage"))
+            return stream_chunks(completion, include_usage=include_usage)
+        return completion
+
 
 @dataclass
 class FakeOpenAIChat:
@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from lalia.llm.cache import ResponseCache, SemanticCache, get_request_key
+
+
+def test_request_key_is_canonical():
+    assert get_request_key({"model": "gpt-4o", "n": 1}) == get_request_key(
+        {"n": 1, "model": "gpt-4o"}
+    )
+    assert get_request_key({"n": 1}) != get_request_key({"n": 2})
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache(maxsize=2)
+    cache["a"] = {"id": "a"}
+    cache["b"] = {"id": "b"}
+    assert cache.get("a") == {"id": "a"}
+
+    cache["c"] = {"id": "c"}
+
+    assert len(cache) == 2
+    assert "b" not in cache
+    assert cache.get("a") == {"id": "a"}
+    assert cache.get("c") == {"id": "c"}
+
+
+def test_response_cache_expires_entries():
+    cache = ResponseCache(ttl=-1)
+    cache["a"] = {"id": "a"}
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_response_cache_is_thread_safe():
+    cache = ResponseCache(maxsize=16)
+
+    def insert_and_get(index):
+        key = str(index % 32)
+        cache[key] = {"id": key}
+        return key, cache.get(key)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(insert_and_get, range(2000)))
+
+    assert all(response is None or response["id"] == key for key, response in results)
+    assert len(cache) <= 16
+
+
+def test_semantic_cache_matches_similar_prompts():
+    embeddings = {
+        "What is the capital of France?": [1.0, 0.0, 0.1],
+        "What's France's capital?": [0.9, 0.0, 0.1],
+        "What is the capital of Spain?": [0.0, 1.0, 0.1],
+    }
+    embedded = []
+
+    def embed(text):
+        embedded.append(text)
+        return embeddings[text]
+
+    cache = SemanticCache(embed=embed, threshold=0.9)
+
+    assert cache.lookup("What is the capital of France?") is None
+    cache.insert("What is the capital of France?", {"id": "paris"})
+    assert embedded == ["What is the capital of France?"]
+
+    assert cache.lookup("What's France's capital?") == {"id": "paris"}
+    assert cache.lookup("What is the capital of Spain?") is None
+    assert cache.lookup("What's France's capital?", context="other") is None
+
+
+def test_semantic_cache_is_thread_safe():
+    def embed(text):
+        index = int(text)
+        return [float(index % 7 == i) for i in range(7)]
+
+    cache = SemanticCache(embed=embed, maxsize=16)
+
+    def lookup_and_insert(index):
+        text = str(index)
+        cached = cache.lookup(text)
+        cache.insert(text, {"id": index})
+        return cached, cache.lookup(text)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lookup_and_insert, range(2000)))
+
+    # texts with the same embedding share their responses
+    assert all(
+        result is None or result["id"] % 7 == index % 7
+        for index, lookups in enumerate(results)
+        for result in lookups
+    )
+    assert len(cache) <= 16
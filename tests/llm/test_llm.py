@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from inspect import cleandoc
 
 import hypothesis
@@ -7,7 +8,14 @@ from hypothesis import strategies as st
 
 from lalia.chat.completions import Choice
 from lalia.chat.messages.messages import AssistantMessage, UserMessage
-from lalia.llm.openai import ChatCompletionResponse, FunctionCallDirective, OpenAIChat
+from lalia.llm.cache import ResponseCache
+from lalia.llm.openai import (
+    ChatCompletionResponse,
+    FunctionCallDirective,
+    OpenAIChat,
+    _assemble_raw_response,
+    _get_arguments_model,
+)
 
 
 @pytest.fixture()
@@ -101,3 +109,155 @@ def test_complete(fake_openai_client_type, functions):
         # stopping here as testing the fake class isn't too relevant
 
     test_complete_with_strategies()
+
+
+def test_llm_complete_streamed(fake_llm, ai_quotes):
+    streamed = []
+    fake_llm.stream_handler = lambda index, content: streamed.append((index, content))
+
+    completion = fake_llm.complete([UserMessage("Hello, who are you?")], stream=True)
+
+    content = completion.choices[0].message.content
+    assert content in (cleandoc(quote) for quote in ai_quotes)
+    assert len(streamed) > 1
+    assert {index for index, _ in streamed} == {0}
+    assert "".join(chunk for _, chunk in streamed) == content
+    # the usage is only sent with the final chunk
+    assert completion.usage["total_tokens"] == 21
+    assert fake_llm.usage.total == 21
+
+
+def test_llm_complete_function_streamed(fake_llm, functions):
+    streamed = []
+    fake_llm.stream_handler = lambda index, content: streamed.append((index, content))
+
+    completion = fake_llm.complete([], functions=functions, stream=True)
+
+    function_call = completion.choices[0].message.function_call
+    assert function_call.name == "drive_crazy"
+    assert "to_drive_crazy" in function_call.arguments
+    assert streamed == []
+    assert fake_llm.usage.total == 21
+
+
+def test_llm_cache_stats(fake_llm):
+    fake_llm.temperature = 0
+    fake_llm.cache = ResponseCache()
+    messages = [UserMessage("Hello, who are you?")]
+
+    first = fake_llm.complete(messages)
+    second = fake_llm.complete(messages)
+
+    assert second.choices[0].message.content == first.choices[0].message.content
+    assert fake_llm.cache_stats.hits == 1
+    assert fake_llm.cache_stats.misses == 1
+    assert fake_llm.cache_stats.cached_tokens == fake_llm.usage.total
+
+
+def test_llm_cache_hit_is_streamed(fake_llm):
+    fake_llm.temperature = 0
+    fake_llm.cache = ResponseCache()
+    messages = [UserMessage("Hello, who are you?")]
+
+    first = fake_llm.complete(messages)
+
+    streamed = []
+    fake_llm.stream_handler = lambda index, content: streamed.append((index, content))
+    second = fake_llm.complete(messages, stream=True)
+
+    assert second.choices[0].message.content == first.choices[0].message.content
+    assert streamed == [(0, first.choices[0].message.content)]
+    assert fake_llm.cache_stats.hits == 1
+
+
+def test_llm_prompt_cache_key(fake_llm, fake_openai_client):
+    messages = [UserMessage("Hello, who are you?")]
+    completions = fake_openai_client.chat.completions
+
+    fake_llm.complete(messages)
+    assert completions.extra_body is None
+
+    fake_llm.prompt_cache_key = "pirates"
+    fake_llm.complete(messages)
+    assert completions.extra_body == {"prompt_cache_key": "pirates"}
+
+    fake_llm.complete(messages, prompt_cache_key="parrots")
+    assert completions.extra_body == {"prompt_cache_key": "parrots"}
+
+
+def test_add_response_is_thread_safe():
+    llm = OpenAIChat(api_key="fake_api_key")
+    usage = {"prompt_tokens": 9, "completion_tokens": 12, "total_tokens": 21}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for _ in range(1000):
+            executor.submit(llm._add_response, {"usage": usage})
+
+    assert len(llm._responses) == 1000
+    assert llm.usage.total == 21 * 1000
+
+
+def test_get_arguments_model(functions):
+    (drive_crazy,) = functions
+    model = _get_arguments_model(drive_crazy)
+
+    assert model is _get_arguments_model(drive_crazy)
+    assert model.__name__ == "drive_crazy_response"
+    assert model.model_validate({"to_drive_crazy": "lalia"}).to_drive_crazy == "lalia"
+
+
+def test_assemble_raw_response():
+    def chunk(choices, usage=None):
+        return {
+            "id": "chatcmpl-1",
+            "created": 1700000000,
+            "model": "gpt-4o-2024-08-06",
+            "choices": choices,
+            "usage": usage,
+        }
+
+    chunks = [
+        chunk([{"index": 0, "delta": {"role": "assistant", "content": "Hello"}}]),
+        chunk(
+            [
+                {
+                    "index": 1,
+                    "delta": {
+                        "function_call": {"name": "drive_crazy", "arguments": '{"to'}
+                    },
+                }
+            ]
+        ),
+        chunk([{"index": 0, "delta": {"content": " there!"}, "finish_reason": "stop"}]),
+        chunk(
+            [
+                {
+                    "index": 1,
+                    "delta": {"function_call": {"arguments": '_drive_crazy": "you"}'}},
+                    "finish_reason": "function_call",
+                }
+            ]
+        ),
+        chunk(
+            [],
+            usage={"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3},
+        ),
+    ]
+
+    streamed = []
+    response = ChatCompletionResponse(
+        **_assemble_raw_response(
+            chunks, lambda index, content: streamed.append((index, content))
+        )
+    )
+
+    assert streamed == [(0, "Hello"), (0, " there!")]
+
+    first, second = response.choices
+    assert first.message.content == "Hello there!"
+    assert first.finish_reason == "stop"
+    assert second.message.content is None
+    assert second.message.function_call.name == "drive_crazy"
+    assert second.message.function_call.arguments == '{"to_drive_crazy": "you"}'
+    assert second.finish_reason == "function_call"
+    assert response.usage["total_tokens"] == 3
@@ -0,0 +1,105 @@
+from lalia.chat.messages.buffer import MessageBuffer
+from lalia.chat.messages.fold_state import FoldState
+from lalia.chat.messages.messages import AssistantMessage, UserMessage
+from lalia.chat.messages.tags import Tag, TagPattern
+
+
+def test_add_messages_matches_add():
+    messages = [
+        UserMessage(content="Hello there!", tags={Tag("user", "introduction")}),
+        AssistantMessage(content="Arrrgh!", tags={Tag("error", "argh!")}),
+        UserMessage(content="Arrrrrrr!"),
+    ]
+
+    added = MessageBuffer(default_fold_tags={TagPattern("error", ".*")})
+    for message in messages:
+        added.add(message)
+
+    batched = MessageBuffer(default_fold_tags={TagPattern("error", ".*")})
+    batched.add_messages(messages)
+
+    assert batched.pending == added.pending
+    assert batched.folds.pending_states == added.folds.pending_states
+    assert batched.folds.pending_states == [
+        FoldState.UNFOLDED,
+        FoldState.FOLDED,
+        FoldState.UNFOLDED,
+    ]
+    assert list(batched) == list(added)
+
+
+def test_view_without_tags(tagged_messages):
+    m = tagged_messages
+    message_states = list(m.folds.message_states)
+    pending_states = list(m.folds.pending_states)
+
+    expanded = m.view(set())
+
+    # reference: unfolding everything reveals all tagged messages
+    m.unfold()
+    assert expanded == list(m)
+    m.fold()
+
+    assert m.folds.message_states == message_states
+    assert m.folds.pending_states == pending_states
+
+
+def test_view_with_tags(tagged_messages):
+    m = tagged_messages
+    message_states = list(m.folds.message_states)
+    pending_states = list(m.folds.pending_states)
+
+    expanded = m.view(TagPattern("system", ".*"))
+
+    assert expanded != list(m)
+
+    # reference: unfolding the tags reveals the matching messages
+    m.unfold(TagPattern("system", ".*"))
+    assert expanded == list(m)
+    m.fold()
+
+    assert m.folds.message_states == message_states
+    assert m.folds.pending_states == pending_states
+
+
+def test_view_with_frozen_tags(tagged_messages):
+    m = tagged_messages
+    tags = {TagPattern("system", ".*")}
+
+    assert m.view(frozenset(tags)) == m.view(tags)
+
+
+def test_expand_yields_buffer(tagged_messages):
+    m = tagged_messages
+    message = UserMessage(content="Arrr, what's in the chest?")
+
+    with m.expand(TagPattern("system", ".*")) as messages:
+        assert messages is m
+        assert list(messages) == m.view(TagPattern("system", ".*"))
+        messages.add(message)
+
+    assert m.pending[-1] is message
+    assert m.folds.pending_states[-1] is FoldState.UNFOLDED
+
+
+def test_replace_all_matches_clear_and_commit(tagged_messages):
+    messages = [
+        UserMessage(content="Hello there!", tags={Tag("user", "introduction")}),
+        AssistantMessage(content="Arrrgh!", tags={Tag("error", "argh!")}),
+    ]
+
+    replaced = tagged_messages
+    replaced.replace_all(messages)
+
+    cleared = MessageBuffer(default_fold_tags={TagPattern("system", ".*")})
+    cleared.add_messages(messages)
+    cleared.commit()
+
+    assert replaced.messages == cleared.messages
+    assert replaced.pending == []
+    assert replaced.folds.message_states == cleared.folds.message_states
+    assert list(replaced) == list(cleared)
+
+    replaced.revert()
+    assert replaced.messages == []
+    assert replaced.pending == messages
@@ -130,6 +130,20 @@ def test_expand(tagged_messages):
         ]
 
 
+def test_expand_restores_folds(tagged_messages):
+    m = tagged_messages
+    message_states = list(m.folds.message_states)
+
+    for _ in range(2):
+        with m.expand({TagPattern("user", ".*"), TagPattern("error", ".*")}):
+            pass
+        with m.collapse(TagPattern("user", ".*")):
+            pass
+
+    assert m.folds.message_states == message_states
+    assert not m.folds.has_custom_folds
+
+
 def test_collapse(tagged_messages):
     m = tagged_messages
     with m.collapse(